@@ -0,0 +1,171 @@
+# Asyncio Web Server with Request-Line Logging
+# CS 538 Project 1 — Event-Loop Web Server (Port 7755)
+# Author: Ampomah Kofi | CWID: 12504602
+#
+# This is an event-loop version of my multithreaded server. Serving static
+# files is pure I/O, so instead of one thread per connection everything runs
+# as coroutines on a single asyncio event loop. That avoids per-thread stack
+# memory and GIL hand-offs, and one loop can juggle thousands of connections.
+# If uvloop is installed it replaces the default loop for extra speed, but
+# the server works fine without it.
+
+import asyncio
+from email.utils import formatdate
+from urllib.parse import unquote
+import mimetypes
+import os
+
+try:
+    import uvloop  # optional faster event loop; plain asyncio otherwise
+except ImportError:
+    uvloop = None
+
+PORT = 7755
+# Serve files from the folder where this script runs; resolved once so
+# the per-request containment check compares against a canonical path
+WEB_ROOT = os.path.realpath(os.getcwd())
+
+# Turn a date into HTTP format (used in response headers)
+
+
+def http_date():
+    return formatdate(usegmt=True)
+
+# Make sure the requested path doesn’t break out of the server folder
+
+
+def safe_path(url_path: str) -> str:
+    raw = unquote(url_path.split("?", 1)[0]).lstrip("/")
+    if raw == "":
+        raw = "webservertesting.html"   # default page when just "/" is requested
+    # realpath resolves ".." and symlinks, and anchoring the prefix check
+    # on os.sep stops a sibling folder like /srv/www2 from passing a
+    # naive startswith("/srv/www") test
+    candidate = os.path.realpath(os.path.join(WEB_ROOT, raw))
+    if candidate != WEB_ROOT and not candidate.startswith(WEB_ROOT + os.sep):
+        return None
+    return candidate
+
+# This coroutine runs for each client connection
+
+
+async def handle_client(reader, writer):
+    client_addr = writer.get_extra_info("peername")
+    print(f"Connected: {client_addr}")
+    try:
+        # Read the HTTP request
+        request_data = (await reader.read(4096)).decode(errors="ignore")
+        if not request_data:
+            return
+
+        lines = request_data.split("\r\n")
+        request_line = lines[0]
+        print("Request line:", request_line)
+
+        # Look for User-Agent just to know which browser/tool connected
+        for line in lines[1:]:
+            if line.lower().startswith("user-agent:"):
+                print("User-Agent:", line)
+                break
+
+        parts = request_line.split()
+        if len(parts) != 3:
+            await send_error(writer, 400, "Bad Request")
+            return
+
+        method, path, version = parts
+
+        # Only support GET in this simple server
+        if method != "GET":
+            await send_error(writer, 405, "Method Not Allowed",
+                             headers=["Allow: GET"])
+            return
+
+        # Map the URL to a real file path
+        filepath = safe_path(path)
+        if not filepath or not os.path.isfile(filepath):
+            await send_error(writer, 404, "Not Found")
+            return
+
+        # Guess the right MIME type so the browser knows how to show it
+        content_type, _ = mimetypes.guess_type(filepath)
+        if not content_type:
+            content_type = "application/octet-stream"
+        if content_type.startswith("text/"):
+            content_type += "; charset=utf-8"
+
+        # Size from the filesystem; the body itself never touches Python
+        content_length = os.path.getsize(filepath)
+
+        # Build the HTTP response headers
+        headers = [
+            f"Date: {http_date()}",
+            "Server: CS538Toy/1.0",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {content_length}",
+            "Connection: close",
+        ]
+        header_block = "HTTP/1.1 200 OK\r\n" + \
+            "\r\n".join(headers) + "\r\n\r\n"
+
+        # Send headers, then the body with loop.sendfile(): zero-copy on
+        # Linux, with asyncio's own chunked fallback where unsupported
+        writer.write(header_block.encode("iso-8859-1"))
+        await writer.drain()
+        loop = asyncio.get_running_loop()
+        with open(filepath, "rb") as f:
+            await loop.sendfile(writer.transport, f)
+
+        print(f"200 OK -> {path} ({content_length} bytes)")
+
+    except Exception as e:
+        print("Error handling client:", e)
+        try:
+            await send_error(writer, 500, "Internal Server Error")
+        except Exception:
+            pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except Exception:
+            pass
+
+# Send a basic error page back to the browser
+
+
+async def send_error(writer, code, reason, headers=None, body=None):
+    if body is None:
+        body = f"<html><body><h1>{code} {reason}</h1></body></html>".encode(
+            "utf-8")
+    base_headers = [
+        f"Date: {http_date()}",
+        "Server: CS538Toy/1.0",
+        "Content-Type: text/html; charset=utf-8",
+        f"Content-Length: {len(body)}",
+        "Connection: close",
+    ]
+    if headers:
+        base_headers.extend(headers)
+    header_block = f"HTTP/1.1 {code} {reason}\r\n" + \
+        "\r\n".join(base_headers) + "\r\n\r\n"
+    writer.write(header_block.encode("iso-8859-1"))
+    writer.write(body)
+    await writer.drain()
+    print(f"{code} {reason}")
+
+# keep listening for new connections
+
+
+async def main():
+    server = await asyncio.start_server(
+        handle_client, "", PORT, backlog=1024)
+    print(f"Asyncio server ready on port {PORT}...")
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    if uvloop is not None:
+        uvloop.install()
+    asyncio.run(main())
@@ -12,11 +12,17 @@
 
 from socket import *
 import sys
+import os
+import stat  # For rejecting directories/special files via S_ISREG
 import mimetypes  # Built-in module for guessing MIME types based on file extension
 
 # Assignment principle: Use a port >5000 to avoid privileged ports
 PORT = 7755
 
+# Deep accept queue: even a single-threaded server benefits, since the kernel
+# can hold a burst of connections instead of resetting them while we're busy
+BACKLOG = SOMAXCONN
+
 # Create the server socket (TCP stream socket for reliable HTTP delivery)
 server_socket = socket(AF_INET, SOCK_STREAM)
 
@@ -26,8 +32,8 @@ server_socket.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
 # Bind to all interfaces ('') on the specified port (listen on localhost for testing)
 server_socket.bind(('', PORT))
 
-# Listen for up to 1 queued connection (single-threaded, so no backlog needed)
-server_socket.listen(1)
+# Listen with a deep backlog so queued connections survive bursts
+server_socket.listen(BACKLOG)
 
 # Print server readiness to CLI for screenshot verification
 print(f"Server is ready to serve on port {PORT}...")
@@ -80,32 +86,45 @@ while True:
         if content_type.startswith("text/"):
             content_type += "; charset=utf-8"
 
-        # Read file content as bytes (text in UTF-8, binary as-is) for universal sending
-        if content_type.startswith("text/"):
-            # Text mode with encoding for safe reading
-            with open(filepath, "r", encoding="utf-8") as file_handle:
-                file_content = file_handle.read().encode("utf-8")
-        else:
-            # Binary mode for images/videos/etc.
-            with open(filepath, "rb") as file_handle:
-                file_content = file_handle.read()
-
-        # Build HTTP/1.1 200 OK response header (includes Content-Length for proper browser handling)
-        response_header = (
-            "HTTP/1.1 200 OK\r\n"
-            f"Content-Type: {content_type}\r\n"
-            f"Content-Length: {len(file_content)}\r\n"
-            # Close after one request (simple server)
-            "Connection: close\r\n\r\n"
-        )
-
-        # Send header and body reliably (sendall ensures all bytes are transmitted)
-        client_socket.sendall(response_header.encode(
-            "iso-8859-1"))  # ISO for headers (robust)
-        client_socket.sendall(file_content)
+        # Open first, then fstat the handle: missing files and directories
+        # raise IOError (-> 404 below) before a single header byte is sent,
+        # so the client never sees a 200 header followed by error bytes
+        with open(filepath, "rb") as file_handle:
+            file_stat = os.fstat(file_handle.fileno())
+            if not stat.S_ISREG(file_stat.st_mode):
+                raise IOError("Not a regular file")
+            content_length = file_stat.st_size
+
+            # Build HTTP/1.1 200 OK response header (includes Content-Length for proper browser handling)
+            response_header = (
+                "HTTP/1.1 200 OK\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {content_length}\r\n"
+                # Close after one request (simple server)
+                "Connection: close\r\n\r\n"
+            )
+
+            # Send header, then the body via sendfile(): zero-copy kernel transfer,
+            # so even video files are never read into a Python bytes object
+            client_socket.sendall(response_header.encode(
+                "iso-8859-1"))  # ISO for headers (robust)
+            try:
+                client_socket.sendfile(file_handle)
+            except OSError:
+                # Only fall back when nothing was transmitted (sendfile
+                # leaves the file at the bytes sent): re-sending after a
+                # mid-transfer failure would corrupt the response, and so
+                # would the 404 handler, so just drop this connection
+                if file_handle.tell() != 0:
+                    print(f"Send failed mid-transfer -> {path}")
+                    continue
+                # sendfile not usable on this socket: stream in 64 KiB chunks
+                # so memory stays bounded instead of reading the whole file
+                while chunk := file_handle.read(65536):
+                    client_socket.sendall(chunk)
 
         # Log successful response (includes bytes sent for verification)
-        print(f"200 OK -> {path} ({len(file_content)} bytes)")
+        print(f"200 OK -> {path} ({content_length} bytes)")
 
     except IOError:
         # Handle missing files with 404 response (HTML body for browser display)